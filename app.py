@@ -9,15 +9,257 @@
 # Project Manager + Delivery Team are replaced with your provided full logic (tiers + weighted KPI)
 
 import streamlit as st
+import numpy as np
 import pandas as pd
+from dataclasses import dataclass
 from datetime import date
+from functools import lru_cache
+from typing import Callable, Optional
 
 st.set_page_config(page_title="Commission & Incentive Calculator", layout="centered")
 st.title("Commission & Incentive Calculator")
 
 
-def clamp_0_1(x: float) -> float:
-    return max(0.0, min(1.0, x))
+def clamp_0_100(x: float) -> float:
+    return max(0.0, min(100.0, x))
+
+
+@lru_cache(maxsize=1024)
+def _pair_rate(base: float, pairs: int) -> float:
+    """IRU / Fiber Lease rate: base + 0.1% per extra pair (pairs > 1)."""
+    new_pairs = max(pairs - 1, 0)
+    return base + (new_pairs * 0.001)
+
+
+@lru_cache(maxsize=1024)
+def _build_rate(v: float, prepay: bool) -> float:
+    """Build to Own rate: <5M=1.2%; 5–15M linearly 1.5%→3.0%; >15M=3.0%; +0.2% if 50% prepaid."""
+    # Same arithmetic as the original closed form so stored "Rate %" values are unchanged
+    base = float(
+        np.where(v < 5_000_000, 0.012, 0.015 + (0.03 - 0.015) * np.clip((v - 5_000_000) / 10_000_000, 0.0, 1.0))
+    )
+    base += 0.002 * prepay
+    return base
+
+
+# Commission Table shows only the last MAX_VIEW rows by default (full data stays in state)
+MAX_VIEW = 200
+
+# Saved-deals schema; fixed categories so concat keeps the categorical dtype
+SALES_DTYPES = {
+    "Date": "string",
+    "Category": pd.CategoricalDtype(["IRU", "Fiber Lease", "Build", "DC Grid"]),
+    "Customer": "string",
+    "Contract Value": "float64",
+    "Pairs": "Int64",
+    "Rate %": "float64",
+    "Commission": "float64",
+    "Currency": pd.CategoricalDtype(["USD", "RM"]),
+}
+SALES_COLUMNS = list(SALES_DTYPES)
+
+
+def empty_sales_df() -> pd.DataFrame:
+    return pd.DataFrame(columns=SALES_COLUMNS).astype(SALES_DTYPES)
+
+
+def add_sales_row(row: dict) -> None:
+    """Queue one deal for the saved-deals DataFrame; see flush_sales_rows()."""
+    st.session_state.sales_pending.append(row)
+
+    # Editor ticks are positional; a new row can shift the visible tail window
+    st.session_state.pop(f"sales_table_editor_{row['Currency']}", None)
+
+
+def flush_sales_rows() -> pd.DataFrame:
+    """Concat any queued deals into sales_df in one go and return it."""
+    pending = st.session_state.sales_pending
+    if pending:
+        new_rows = pd.DataFrame(pending, columns=SALES_COLUMNS).astype(SALES_DTYPES)
+        df = st.session_state.sales_df
+        st.session_state.sales_df = new_rows if df.empty else pd.concat([df, new_rows], ignore_index=True)
+        st.session_state.sales_version += 1
+        pending.clear()
+    return st.session_state.sales_df
+
+
+def sales_currency_view(currency: str) -> tuple:
+    """
+    Saved deals for one currency (0-based index) and their totals {"value", "comm"}.
+    Both are rebuilt only when sales_version changes.
+    """
+    # Flush first so queued deals bump sales_version before the cache check
+    df_all = flush_sales_rows()
+    view_key = (st.session_state.sales_version, currency)
+    cached = st.session_state.get("_sales_view")
+    if cached is not None and cached[0] == view_key:
+        return cached[1], cached[2]
+
+    df_cur = df_all[df_all["Currency"] == currency].reset_index(drop=True)
+    # Summed from the data on each change, so totals never drift across adds/deletes
+    totals = {
+        "value": float(df_cur["Contract Value"].sum()),
+        "comm": float(df_cur["Commission"].sum()),
+    }
+    st.session_state["_sales_view"] = (view_key, df_cur, totals)
+    return df_cur, totals
+
+
+# Delete / clear run as button callbacks, i.e. before the next script run draws the table,
+# so the page renders the updated deals without an extra st.rerun().
+def delete_ticked_sales_rows(edited: pd.DataFrame, currency: str) -> None:
+    ticked_nos = edited.loc[edited["🗑 Delete?"].astype(bool), "No."].to_numpy()
+
+    if ticked_nos.size == 0:
+        # Callback output renders at the top of the page, so use a toast rather than st.warning
+        st.toast("No rows ticked.")
+        return
+
+    df_all = flush_sales_rows()
+    # "No." is 1-based within the current currency
+    cur_idx = df_all.index[df_all["Currency"] == currency]
+    drop_idx = cur_idx[np.isin(np.arange(1, len(cur_idx) + 1), ticked_nos)]
+    st.session_state.sales_df = df_all.drop(drop_idx).reset_index(drop=True)
+    st.session_state.sales_version += 1
+
+    # Drop the editor's tick state so it is not re-applied to the shifted rows
+    st.session_state.pop(f"sales_table_editor_{currency}", None)
+
+
+def clear_sales_rows(currency: Optional[str] = None) -> None:
+    """Clear saved deals for one currency, or for all currencies when currency is None."""
+    df_all = flush_sales_rows()
+    if currency is None:
+        st.session_state.sales_df = empty_sales_df()
+        cleared = list(SALES_DTYPES["Currency"].categories)
+    else:
+        st.session_state.sales_df = df_all[df_all["Currency"] != currency].reset_index(drop=True)
+        cleared = [currency]
+
+    st.session_state.sales_version += 1
+
+    for c in cleared:
+        st.session_state.pop(f"sales_table_editor_{c}", None)
+
+
+@st.cache_data
+def _rules_df() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {
+                "Category": "IRU",
+                "Rate Rule": "Base 3% + 0.1% per extra pair (pairs > 1)",
+                "Commission Formula": "Contract Value × Rate",
+            },
+            {
+                "Category": "Fiber Lease",
+                "Rate Rule": "Base 2% + 0.1% per extra pair (pairs > 1)",
+                "Commission Formula": "Contract Value × Rate",
+            },
+            {
+                "Category": "Build to Own",
+                "Rate Rule": "<5M=1.2%; 5–15M linearly 1.5%→3.0%; >15M=3.0%; +0.2% if 50% prepaid",
+                "Commission Formula": "Contract Value × Rate",
+            },
+            {
+                "Category": "DC Grid",
+                "Rate Rule": "Existing=3%; New=4%; Hyperscaler=5%",
+                "Commission Formula": "Contract Value × Rate",
+            },
+        ]
+    )
+
+
+@st.cache_data
+def _default_sales_bonus_tiers() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"Min Total Contract Value (inclusive)": 0, "Bonus % on Total": 0.0},
+            {"Min Total Contract Value (inclusive)": 1_000_000, "Bonus % on Total": 0.2},
+            {"Min Total Contract Value (inclusive)": 5_000_000, "Bonus % on Total": 0.5},
+            {"Min Total Contract Value (inclusive)": 10_000_000, "Bonus % on Total": 0.8},
+            {"Min Total Contract Value (inclusive)": 15_000_000, "Bonus % on Total": 1.0},
+        ]
+    )
+
+
+@st.cache_data
+def _pm_tiers_default() -> pd.DataFrame:
+    return pd.DataFrame(
+        [
+            {"Tier": "Tier 1", "From #": 1, "To #": 3, "Rate per project": 500.0},
+            {"Tier": "Tier 2", "From #": 4, "To #": 6, "Rate per project": 700.0},
+            {"Tier": "Tier 3", "From #": 7, "To #": 9999, "Rate per project": 900.0},
+        ]
+    )
+
+
+def sorted_tiers_cached(tiers: pd.DataFrame, by: str, state_key: str) -> pd.DataFrame:
+    """Sort tiers by `by`, reusing the sorted frame kept in session state until the tier values change."""
+    tiers_key = tuple(map(tuple, tiers.to_records(index=False)))
+    cached = st.session_state.get(state_key)
+    if cached is not None and cached[0] == tiers_key:
+        return cached[1]
+
+    sorted_tiers = tiers.sort_values(by)
+    st.session_state[state_key] = (tiers_key, sorted_tiers)
+    return sorted_tiers
+
+
+@dataclass
+class KpiSection:
+    """
+    One weighted KPI block for the Project Manager / Delivery Team pages.
+    inputs entries are ("num", name, label, number_input kwargs) or ("chk", name, label);
+    compute receives {name: widget value} and returns a 0–100 score.
+    """
+    title: str
+    weight: float
+    inputs: list
+    compute: Callable[[dict], float]
+    caption: str = ""
+
+
+def render_kpi_block(sections: list, key_prefix: str, decimals: int) -> tuple:
+    """
+    Render each KPI section's widgets and score, then the KPI Result summary.
+    Widget keys are "<key_prefix>_<name>". Returns (kpi_score 0–1, bonus_months).
+    """
+    KPI_total = 0.0
+    for i, sec in enumerate(sections, start=1):
+        st.markdown(f"#### {i}) {sec.title} — {sec.weight * 100:.0f}%")
+        if sec.caption:
+            st.caption(sec.caption)
+
+        vals = {}
+        for kind, name, label, *opts in sec.inputs:
+            key = f"{key_prefix}_{name}"
+            if kind == "num":
+                vals[name] = st.number_input(label, key=key, **opts[0])
+            else:
+                vals[name] = st.checkbox(label, key=key)
+
+        score = sec.compute(vals)
+        st.write(f"{sec.title} score: **{score:.{decimals}f}/100**")
+        st.divider()
+
+        KPI_total += score * sec.weight
+
+    kpi_score = KPI_total / 100.0
+
+    st.markdown("### KPI Result")
+    st.write(f"**Overall KPI score:** **{KPI_total:.{decimals}f}%**")
+
+    if kpi_score < 0.5:
+        bonus_months = 1.0
+    else:
+        bonus_months = 1.0 + 5.0 * ((kpi_score - 0.5) / 0.5)
+
+    bonus_months = min(bonus_months, 6.0)
+    bonus_months = round(bonus_months, 2)
+
+    st.write(f"**Bonus months (1.00 to 6.00):** **{bonus_months:.2f} months**")
+    return kpi_score, bonus_months
 
 
 # =========================================================
@@ -37,21 +279,19 @@ if role == "Salesman":
     # =========================
     # Session storage
     # =========================
-    if "sales_rows" not in st.session_state:
-        st.session_state.sales_rows = []
+    if "sales_df" not in st.session_state:
+        st.session_state.sales_df = empty_sales_df()
+    # Deals added since the last table render; see flush_sales_rows()
+    if "sales_pending" not in st.session_state:
+        st.session_state.sales_pending = []
+    # Bumped on every change to sales_df; keys the cached currency view
+    if "sales_version" not in st.session_state:
+        st.session_state.sales_version = 0
 
     # Default tier headers (friendly names)
     # Bonus % is stored as "percent" (e.g. 0.2 means 0.2%)
     if "sales_bonus_tiers" not in st.session_state:
-        st.session_state.sales_bonus_tiers = pd.DataFrame(
-            [
-                {"Min Total Contract Value (inclusive)": 0, "Bonus % on Total": 0.0},
-                {"Min Total Contract Value (inclusive)": 1_000_000, "Bonus % on Total": 0.2},
-                {"Min Total Contract Value (inclusive)": 5_000_000, "Bonus % on Total": 0.5},
-                {"Min Total Contract Value (inclusive)": 10_000_000, "Bonus % on Total": 0.8},
-                {"Min Total Contract Value (inclusive)": 15_000_000, "Bonus % on Total": 1.0},
-            ]
-        )
+        st.session_state.sales_bonus_tiers = _default_sales_bonus_tiers()
 
     def normalize_tier_df(df: pd.DataFrame) -> pd.DataFrame:
         """
@@ -68,10 +308,19 @@ if role == "Salesman":
             "Bonus % on Total": "Bonus %",
             "Bonus % On Total": "Bonus %",
         }
-        out = df.copy()
-        out.columns = [c.strip() for c in out.columns]
-        out = out.rename(columns=rename_map)
-
+        # Shallow copy: renaming headers doesn't touch the data
+        out = df.copy(deep=False)
+        out.columns = [rename_map.get(c.strip(), c.strip()) for c in out.columns]
+
+        # Fast path (the usual case): numeric columns without blanks need no coercion or copy
+        if (
+            set(out.columns) == {"Min Total Contract Value", "Bonus %"}
+            and out.dtypes.apply(pd.api.types.is_numeric_dtype).all()
+            and not out.isna().any().any()
+        ):
+            return out
+
+        out = out.copy()
         if "Min Total Contract Value" in out.columns:
             out["Min Total Contract Value"] = pd.to_numeric(out["Min Total Contract Value"], errors="coerce").fillna(0.0)
         if "Bonus %" in out.columns:
@@ -84,31 +333,7 @@ if role == "Salesman":
     # =========================
     with st.expander("📌 Commission Rules (Reference Table)", expanded=True):
         st.caption("Reference only. The calculator below uses these formulas.")
-        rules_df = pd.DataFrame(
-            [
-                {
-                    "Category": "IRU",
-                    "Rate Rule": "Base 3% + 0.1% per extra pair (pairs > 1)",
-                    "Commission Formula": "Contract Value × Rate",
-                },
-                {
-                    "Category": "Fiber Lease",
-                    "Rate Rule": "Base 2% + 0.1% per extra pair (pairs > 1)",
-                    "Commission Formula": "Contract Value × Rate",
-                },
-                {
-                    "Category": "Build to Own",
-                    "Rate Rule": "<5M=1.2%; 5–15M linearly 1.5%→3.0%; >15M=3.0%; +0.2% if 50% prepaid",
-                    "Commission Formula": "Contract Value × Rate",
-                },
-                {
-                    "Category": "DC Grid",
-                    "Rate Rule": "Existing=3%; New=4%; Hyperscaler=5%",
-                    "Commission Formula": "Contract Value × Rate",
-                },
-            ]
-        )
-        st.dataframe(rules_df, use_container_width=True, hide_index=True)
+        st.dataframe(_rules_df(), use_container_width=True, hide_index=True)
 
     st.divider()
 
@@ -119,169 +344,162 @@ if role == "Salesman":
 
     # ---------- IRU ----------
     with st.expander("1) IRU", expanded=True):
-        iru_date = st.date_input("Deal date (IRU)", value=date.today(), key="iru_date")
-        c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
-
-        with c1:
-            iru_customer = st.text_input("Customer", key="iru_c")
-        with c2:
-            iru_value = st.number_input(
-                f"Contract Value ({currency})",
-                min_value=0.0,
-                value=0.0,
-                step=10000.0,
-                key="iru_v",
-            )
-        with c3:
-            iru_pairs = st.number_input("Pairs", min_value=0, value=0, step=1, key="iru_p")
-        with c4:
-            if st.button("Add IRU", key="add_iru"):
-                base = 0.03
-                new_pairs = max(int(iru_pairs) - 1, 0)
-                rate = base + (new_pairs * 0.001)  # +0.1% per extra pair
-                commission = float(iru_value) * rate
-
-                st.session_state.sales_rows.append(
-                    {
-                        "Date": str(iru_date),
-                        "Category": "IRU",
-                        "Customer": (iru_customer or "").strip(),
-                        "Contract Value": float(iru_value),
-                        "Pairs": int(iru_pairs),
-                        "Rate %": round(rate * 100, 3),
-                        "Commission": float(commission),
-                        "Currency": currency,
-                    }
+        with st.form("iru_form"):
+            iru_date = st.date_input("Deal date (IRU)", value=date.today(), key="iru_date")
+            c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+
+            with c1:
+                iru_customer = st.text_input("Customer", key="iru_c")
+            with c2:
+                iru_value = st.number_input(
+                    f"Contract Value ({currency})",
+                    min_value=0.0,
+                    value=0.0,
+                    step=10000.0,
+                    key="iru_v",
                 )
-                st.rerun()
+            with c3:
+                iru_pairs = st.number_input("Pairs", min_value=0, value=0, step=1, key="iru_p")
+            with c4:
+                submitted = st.form_submit_button("Add IRU")
+
+        if submitted:
+            rate = _pair_rate(0.03, int(iru_pairs))
+            commission = float(iru_value) * rate
+
+            add_sales_row(
+                {
+                    "Date": str(iru_date),
+                    "Category": "IRU",
+                    "Customer": (iru_customer or "").strip(),
+                    "Contract Value": float(iru_value),
+                    "Pairs": int(iru_pairs),
+                    "Rate %": round(rate * 100, 3),
+                    "Commission": float(commission),
+                    "Currency": currency,
+                }
+            )
 
     # ---------- FIBER LEASE ----------
     with st.expander("2) Fiber Lease", expanded=True):
-        lease_date = st.date_input("Deal date (Lease)", value=date.today(), key="lease_date")
-        c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
-
-        with c1:
-            l_customer = st.text_input("Customer", key="l_c")
-        with c2:
-            l_value = st.number_input(
-                f"Contract Value ({currency})",
-                min_value=0.0,
-                value=0.0,
-                step=10000.0,
-                key="l_v",
-            )
-        with c3:
-            l_pairs = st.number_input("Pairs", min_value=0, value=0, step=1, key="l_p")
-        with c4:
-            if st.button("Add Lease", key="add_lease"):
-                base = 0.02
-                new_pairs = max(int(l_pairs) - 1, 0)
-                rate = base + (new_pairs * 0.001)  # +0.1% per extra pair
-                commission = float(l_value) * rate
-
-                st.session_state.sales_rows.append(
-                    {
-                        "Date": str(lease_date),
-                        "Category": "Fiber Lease",
-                        "Customer": (l_customer or "").strip(),
-                        "Contract Value": float(l_value),
-                        "Pairs": int(l_pairs),
-                        "Rate %": round(rate * 100, 3),
-                        "Commission": float(commission),
-                        "Currency": currency,
-                    }
+        with st.form("lease_form"):
+            lease_date = st.date_input("Deal date (Lease)", value=date.today(), key="lease_date")
+            c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+
+            with c1:
+                l_customer = st.text_input("Customer", key="l_c")
+            with c2:
+                l_value = st.number_input(
+                    f"Contract Value ({currency})",
+                    min_value=0.0,
+                    value=0.0,
+                    step=10000.0,
+                    key="l_v",
                 )
-                st.rerun()
+            with c3:
+                l_pairs = st.number_input("Pairs", min_value=0, value=0, step=1, key="l_p")
+            with c4:
+                submitted = st.form_submit_button("Add Lease")
+
+        if submitted:
+            rate = _pair_rate(0.02, int(l_pairs))
+            commission = float(l_value) * rate
+
+            add_sales_row(
+                {
+                    "Date": str(lease_date),
+                    "Category": "Fiber Lease",
+                    "Customer": (l_customer or "").strip(),
+                    "Contract Value": float(l_value),
+                    "Pairs": int(l_pairs),
+                    "Rate %": round(rate * 100, 3),
+                    "Commission": float(commission),
+                    "Currency": currency,
+                }
+            )
 
     # ---------- BUILD ----------
     with st.expander("3) Build to Own", expanded=True):
-        build_date = st.date_input("Deal date (Build)", value=date.today(), key="build_date")
-        c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
-
-        with c1:
-            b_customer = st.text_input("Customer", key="b_c")
-        with c2:
-            b_value = st.number_input(
-                f"Contract Value ({currency})",
-                min_value=0.0,
-                value=0.0,
-                step=10000.0,
-                key="b_v",
-            )
-        with c3:
-            prepay = st.checkbox("50% prepaid (+0.2%)", key="b_prepay")
-        with c4:
-            if st.button("Add Build", key="add_build"):
-                v = float(b_value)
-
-                if v < 5_000_000:
-                    base = 0.012
-                elif v <= 15_000_000:
-                    t = (v - 5_000_000) / 10_000_000
-                    base = 0.015 + (0.03 - 0.015) * clamp_0_1(t)
-                else:
-                    base = 0.03
-
-                if prepay:
-                    base += 0.002
-
-                commission = v * base
-
-                st.session_state.sales_rows.append(
-                    {
-                        "Date": str(build_date),
-                        "Category": "Build",
-                        "Customer": (b_customer or "").strip(),
-                        "Contract Value": float(b_value),
-                        "Pairs": "",
-                        "Rate %": round(base * 100, 3),
-                        "Commission": float(commission),
-                        "Currency": currency,
-                    }
+        with st.form("build_form"):
+            build_date = st.date_input("Deal date (Build)", value=date.today(), key="build_date")
+            c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+
+            with c1:
+                b_customer = st.text_input("Customer", key="b_c")
+            with c2:
+                b_value = st.number_input(
+                    f"Contract Value ({currency})",
+                    min_value=0.0,
+                    value=0.0,
+                    step=10000.0,
+                    key="b_v",
                 )
-                st.rerun()
+            with c3:
+                prepay = st.checkbox("50% prepaid (+0.2%)", key="b_prepay")
+            with c4:
+                submitted = st.form_submit_button("Add Build")
+
+        if submitted:
+            v = float(b_value)
+            base = _build_rate(v, bool(prepay))
+            commission = v * base
+
+            add_sales_row(
+                {
+                    "Date": str(build_date),
+                    "Category": "Build",
+                    "Customer": (b_customer or "").strip(),
+                    "Contract Value": float(b_value),
+                    "Pairs": pd.NA,
+                    "Rate %": round(base * 100, 3),
+                    "Commission": float(commission),
+                    "Currency": currency,
+                }
+            )
 
     # ---------- DC GRID ----------
     with st.expander("4) DC Grid", expanded=True):
-        dc_date = st.date_input("Deal date (DC Grid)", value=date.today(), key="dc_date")
-        c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
-
-        with c1:
-            d_customer = st.text_input("Customer", key="d_c")
-        with c2:
-            d_value = st.number_input(
-                f"Contract Value ({currency})",
-                min_value=0.0,
-                value=0.0,
-                step=10000.0,
-                key="d_v",
-            )
-        with c3:
-            d_type = st.selectbox("Type", ["Existing 3%", "New 4%", "Hyperscaler 5%"], key="d_type")
-        with c4:
-            if st.button("Add DC", key="add_dc"):
-                if "3" in d_type:
-                    rate = 0.03
-                elif "4" in d_type:
-                    rate = 0.04
-                else:
-                    rate = 0.05
-
-                commission = float(d_value) * rate
-
-                st.session_state.sales_rows.append(
-                    {
-                        "Date": str(dc_date),
-                        "Category": "DC Grid",
-                        "Customer": (d_customer or "").strip(),
-                        "Contract Value": float(d_value),
-                        "Pairs": "",
-                        "Rate %": round(rate * 100, 3),
-                        "Commission": float(commission),
-                        "Currency": currency,
-                    }
+        with st.form("dc_form"):
+            dc_date = st.date_input("Deal date (DC Grid)", value=date.today(), key="dc_date")
+            c1, c2, c3, c4 = st.columns([2, 2, 1, 1])
+
+            with c1:
+                d_customer = st.text_input("Customer", key="d_c")
+            with c2:
+                d_value = st.number_input(
+                    f"Contract Value ({currency})",
+                    min_value=0.0,
+                    value=0.0,
+                    step=10000.0,
+                    key="d_v",
                 )
-                st.rerun()
+            with c3:
+                d_type = st.selectbox("Type", ["Existing 3%", "New 4%", "Hyperscaler 5%"], key="d_type")
+            with c4:
+                submitted = st.form_submit_button("Add DC")
+
+        if submitted:
+            if "3" in d_type:
+                rate = 0.03
+            elif "4" in d_type:
+                rate = 0.04
+            else:
+                rate = 0.05
+
+            commission = float(d_value) * rate
+
+            add_sales_row(
+                {
+                    "Date": str(dc_date),
+                    "Category": "DC Grid",
+                    "Customer": (d_customer or "").strip(),
+                    "Contract Value": float(d_value),
+                    "Pairs": pd.NA,
+                    "Rate %": round(rate * 100, 3),
+                    "Commission": float(commission),
+                    "Currency": currency,
+                }
+            )
 
     st.divider()
 
@@ -290,64 +508,75 @@ if role == "Salesman":
     # =========================
     st.markdown("## Commission Table (Saved Deals)")
 
-    if st.session_state.sales_rows:
-        df_all = pd.DataFrame(st.session_state.sales_rows)
-        df_view = df_all[df_all["Currency"] == currency].reset_index(drop=True).copy()
+    # Shared by the Commission Table and FINAL BONUS sections below
+    df_all = flush_sales_rows()
+    df_cur, cur_totals = sales_currency_view(currency)
 
-        if df_view.empty:
+    if not df_all.empty:
+        if df_cur.empty:
             st.info("No data for this currency yet.")
         else:
-            df_view.insert(0, "No.", range(1, len(df_view) + 1))
-            df_view.insert(1, "🗑 Delete?", False)
-
             st.caption("Tick rows to delete, then click 'Delete ticked rows'.")
 
+            editor_key = f"sales_table_editor_{currency}"
+            show_n = MAX_VIEW
+            if len(df_cur) > MAX_VIEW:
+                # Stable key keeps the user's choice as rows are added; clamp it after deletes
+                show_key = f"sales_show_n_{currency}"
+                st.session_state[show_key] = min(st.session_state.get(show_key, MAX_VIEW), len(df_cur))
+                show_n = st.slider(
+                    "Show last N rows",
+                    50,
+                    len(df_cur),
+                    key=show_key,
+                    on_change=lambda: st.session_state.pop(editor_key, None),
+                )
+            # Copy only the visible tail (df_cur is cached); "No." numbers the full
+            # currency view, so ticks still map back to the right rows
+            df_display = df_cur.tail(show_n).copy()
+            df_display.insert(0, "No.", range(len(df_cur) - len(df_display) + 1, len(df_cur) + 1))
+            df_display.insert(1, "🗑 Delete?", False)
+
             edited = st.data_editor(
-                df_view,
+                df_display,
                 use_container_width=True,
                 hide_index=True,
-                key=f"sales_table_editor_{currency}",
+                key=editor_key,
                 disabled=[
                     "No.", "Date", "Category", "Customer", "Contract Value",
                     "Pairs", "Rate %", "Commission", "Currency"
                 ],
             )
 
-            total_value = float(df_view["Contract Value"].sum())
-            total_comm = float(df_view["Commission"].sum())
+            total_value = cur_totals["value"]
+            total_comm = cur_totals["comm"]
             st.write(f"Total Contract Value: {total_value:,.2f} {currency}")
             st.write(f"Total Commission: {total_comm:,.2f} {currency}")
 
             col1, col2, col3 = st.columns([1.2, 1.2, 1.6])
 
             with col1:
-                if st.button("🗑 Delete ticked rows", key=f"btn_delete_ticked_{currency}"):
-                    ticked_nos = edited.loc[edited["🗑 Delete?"] == True, "No."].tolist()
-
-                    if not ticked_nos:
-                        st.warning("No rows ticked.")
-                    else:
-                        cur_rows = [r for r in st.session_state.sales_rows if r["Currency"] == currency]
-                        other_rows = [r for r in st.session_state.sales_rows if r["Currency"] != currency]
-
-                        keep_cur = []
-                        for i, r in enumerate(cur_rows):
-                            row_no = i + 1
-                            if row_no not in ticked_nos:
-                                keep_cur.append(r)
-
-                        st.session_state.sales_rows = other_rows + keep_cur
-                        st.rerun()
+                st.button(
+                    "🗑 Delete ticked rows",
+                    key=f"btn_delete_ticked_{currency}",
+                    on_click=delete_ticked_sales_rows,
+                    args=(edited, currency),
+                )
 
             with col2:
-                if st.button(f"🧹 Clear ALL ({currency})", key=f"btn_clear_currency_{currency}"):
-                    st.session_state.sales_rows = [r for r in st.session_state.sales_rows if r["Currency"] != currency]
-                    st.rerun()
+                st.button(
+                    f"🧹 Clear ALL ({currency})",
+                    key=f"btn_clear_currency_{currency}",
+                    on_click=clear_sales_rows,
+                    args=(currency,),
+                )
 
             with col3:
-                if st.button("🔥 Clear ALL (ALL currencies)", key="btn_clear_all_currencies"):
-                    st.session_state.sales_rows = []
-                    st.rerun()
+                st.button(
+                    "🔥 Clear ALL (ALL currencies)",
+                    key="btn_clear_all_currencies",
+                    on_click=clear_sales_rows,
+                )
     else:
         st.info("No data yet. Add a deal in any category.")
 
@@ -377,21 +606,21 @@ if role == "Salesman":
         )
         st.stop()
 
-    df_all = pd.DataFrame(st.session_state.sales_rows) if st.session_state.sales_rows else pd.DataFrame()
-    df = df_all[df_all["Currency"] == currency] if not df_all.empty else pd.DataFrame()
+    df = df_cur
 
     if df.empty:
         st.info("Add at least 1 row in this currency to calculate bonus.")
     else:
-        total_value = float(df["Contract Value"].sum())
-        total_comm = float(df["Commission"].sum())
+        total_value = cur_totals["value"]
+        total_comm = cur_totals["comm"]
 
-        tiers = tiers_norm.sort_values("Min Total Contract Value")
+        tiers = sorted_tiers_cached(tiers_norm, "Min Total Contract Value", "_sales_sorted_tiers")
+        mins = tiers["Min Total Contract Value"].to_numpy()
+        rates = tiers["Bonus %"].to_numpy()
 
-        bonus_rate = 0.0
-        for _, r in tiers.iterrows():
-            if total_value >= float(r["Min Total Contract Value"]):
-                bonus_rate = float(r["Bonus %"]) / 100.0
+        # Highest tier whose minimum is <= total_value
+        idx = int(np.searchsorted(mins, total_value, side="right")) - 1
+        bonus_rate = float(rates[idx]) / 100.0 if idx >= 0 else 0.0
 
         bonus = total_value * bonus_rate
         total_incentive = total_comm + bonus
@@ -410,9 +639,6 @@ elif role == "Project Manager":
     st.subheader("Project Manager Incentive (On-time Projects + KPI Bonus)")
     currency = st.selectbox("Currency", ["RM", "USD"], key="pm_currency")
 
-    def clamp_0_100(x: float) -> float:
-        return max(0.0, min(100.0, x))
-
     st.markdown("## Part A — On-time Delivery Bonus (Tiered)")
     st.caption("Enter number of projects delivered on time. Bonus is calculated by editable tiers.")
 
@@ -425,44 +651,30 @@ elif role == "Project Manager":
     )
 
     st.markdown("### Tier setup (editable)")
-    tiers_default = pd.DataFrame(
-        [
-            {"Tier": "Tier 1", "From #": 1, "To #": 3, "Rate per project": 500.0},
-            {"Tier": "Tier 2", "From #": 4, "To #": 6, "Rate per project": 700.0},
-            {"Tier": "Tier 3", "From #": 7, "To #": 9999, "Rate per project": 900.0},
-        ]
+    tiers = st.data_editor(_pm_tiers_default(), use_container_width=True, hide_index=True, key="pm_tiers_editor")
+
+    tiers_sorted = sorted_tiers_cached(tiers, "From #", "_pm_sorted_tiers")
+    start = tiers_sorted["From #"].to_numpy(int)
+    end = tiers_sorted["To #"].to_numpy(int)
+    rate = tiers_sorted["Rate per project"].to_numpy(float)
+
+    counts = np.clip(np.minimum(ontime_projects, end) - start + 1, 0, None)
+    payouts = counts * rate
+    part_a_bonus = float(payouts.sum())
+
+    # Only tiers the on-time count has reached are shown
+    reached = ontime_projects >= start
+    breakdown_rows = pd.DataFrame(
+        {
+            "Tier": tiers_sorted["Tier"].astype(str).to_numpy()[reached],
+            "Projects counted": counts[reached],
+            "Rate per project": [f"{r:,.2f} {currency}" for r in rate[reached]],
+            "Tier payout": [f"{p:,.2f} {currency}" for p in payouts[reached]],
+        }
     )
-    tiers = st.data_editor(tiers_default, use_container_width=True, hide_index=True, key="pm_tiers_editor")
-
-    part_a_bonus = 0.0
-    breakdown_rows = []
-    tiers_sorted = tiers.sort_values("From #")
-
-    for _, t in tiers_sorted.iterrows():
-        start = int(t["From #"])
-        end = int(t["To #"])
-        rate = float(t["Rate per project"])
-
-        if ontime_projects < start:
-            continue
-
-        tier_count = min(ontime_projects, end) - start + 1
-        tier_count = max(tier_count, 0)
-
-        tier_pay = tier_count * rate
-        part_a_bonus += tier_pay
-
-        breakdown_rows.append(
-            {
-                "Tier": str(t["Tier"]),
-                "Projects counted": tier_count,
-                "Rate per project": f"{rate:,.2f} {currency}",
-                "Tier payout": f"{tier_pay:,.2f} {currency}",
-            }
-        )
 
     st.write("### Tier breakdown")
-    st.dataframe(pd.DataFrame(breakdown_rows), use_container_width=True)
+    st.dataframe(breakdown_rows, use_container_width=True)
     st.success(f"Part A On-time bonus: {part_a_bonus:,.2f} {currency}")
 
     st.divider()
@@ -481,87 +693,57 @@ elif role == "Project Manager":
         key="pm_basic_salary",
     )
 
-    st.markdown("#### 1) On-time completion — 40%")
-    milestone_on_schedule_pct = st.number_input(
-        "% of milestones achieved on schedule (0–100)",
-        min_value=0.0,
-        max_value=100.0,
-        value=90.0,
-        step=1.0,
-        key="pm_milestone_pct",
-    )
-    delay_days = st.number_input(
-        "Final completion delay (days)",
-        min_value=0.0,
-        value=0.0,
-        step=1.0,
-        key="pm_delay_days",
-    )
-
-    milestone_score = clamp_0_100(milestone_on_schedule_pct)
-    timeline_score = clamp_0_100(100.0 - 5.0 * delay_days)
-    ontime_header_score = (milestone_score + timeline_score) / 2.0
-    st.write(f"On-time completion score: **{ontime_header_score:.2f}/100**")
-    st.divider()
-
-    st.markdown("#### 2) Delivery quality — 20%")
-    otdr_fail = st.checkbox("OTDR test fail happened (tick if YES)", key="pm_otdr_fail")
-    no_major_defect_60 = st.checkbox("No major defect within 60 days", key="pm_no_major_defect_60")
-
-    quality_score = 100.0
-    if otdr_fail:
-        quality_score -= 50.0
-    if not no_major_defect_60:
-        quality_score -= 50.0
-    quality_score = clamp_0_100(quality_score)
-    st.write(f"Delivery quality score: **{quality_score:.2f}/100**")
-    st.divider()
-
-    st.markdown("#### 3) Customer acceptance & activation — 15%")
-    activation_no_dispute = st.checkbox("Activation without dispute", key="pm_activation_no_dispute")
-    no_sla_penalty_60 = st.checkbox("No SLA penalty within 60 days after activation", key="pm_no_sla_penalty_60")
-
-    cust_score = ((100.0 if activation_no_dispute else 0.0) + (100.0 if no_sla_penalty_60 else 0.0)) / 2.0
-    st.write(f"Customer acceptance & activation score: **{cust_score:.2f}/100**")
-    st.divider()
-
-    st.markdown("#### 4) Compliance & safety — 15%")
-    no_authority_penalty = st.checkbox("No authority penalty", key="pm_no_authority_penalty")
-    no_safety_incident = st.checkbox("No safety incident", key="pm_no_safety_incident")
-
-    comp_score = ((100.0 if no_authority_penalty else 0.0) + (100.0 if no_safety_incident else 0.0)) / 2.0
-    st.write(f"Compliance & safety score: **{comp_score:.2f}/100**")
-    st.divider()
-
-    st.markdown("#### 5) Internal coordination & reporting — 10%")
-    weekly_reporting = st.checkbox("Weekly reporting discipline", key="pm_weekly_reporting")
-    accurate_tracking = st.checkbox("Accurate tracking of material & labour usage report", key="pm_accurate_tracking")
-
-    internal_score = ((100.0 if weekly_reporting else 0.0) + (100.0 if accurate_tracking else 0.0)) / 2.0
-    st.write(f"Internal coordination & reporting score: **{internal_score:.2f}/100**")
-    st.divider()
-
-    KPI_total = (
-        ontime_header_score * 0.40
-        + quality_score * 0.20
-        + cust_score * 0.15
-        + comp_score * 0.15
-        + internal_score * 0.10
-    )
-    kpi_score = KPI_total / 100.0
-
-    st.markdown("### KPI Result")
-    st.write(f"**Overall KPI score:** **{KPI_total:.2f}%**")
-
-    if kpi_score < 0.5:
-        bonus_months = 1.0
-    else:
-        bonus_months = 1.0 + 5.0 * ((kpi_score - 0.5) / 0.5)
-
-    bonus_months = min(bonus_months, 6.0)
-    bonus_months = round(bonus_months, 2)
-
-    st.write(f"**Bonus months (1.00 to 6.00):** **{bonus_months:.2f} months**")
+    pm_sections = [
+        KpiSection(
+            "On-time completion", 0.40,
+            inputs=[
+                ("num", "milestone_pct", "% of milestones achieved on schedule (0–100)",
+                 dict(min_value=0.0, max_value=100.0, value=90.0, step=1.0)),
+                ("num", "delay_days", "Final completion delay (days)",
+                 dict(min_value=0.0, value=0.0, step=1.0)),
+            ],
+            compute=lambda v: (
+                clamp_0_100(v["milestone_pct"]) + clamp_0_100(100.0 - 5.0 * v["delay_days"])
+            ) / 2.0,
+        ),
+        KpiSection(
+            "Delivery quality", 0.20,
+            inputs=[
+                ("chk", "otdr_fail", "OTDR test fail happened (tick if YES)"),
+                ("chk", "no_major_defect_60", "No major defect within 60 days"),
+            ],
+            compute=lambda v: clamp_0_100(
+                100.0
+                - 50.0 * v["otdr_fail"]
+                - 50.0 * (not v["no_major_defect_60"])
+            ),
+        ),
+        KpiSection(
+            "Customer acceptance & activation", 0.15,
+            inputs=[
+                ("chk", "activation_no_dispute", "Activation without dispute"),
+                ("chk", "no_sla_penalty_60", "No SLA penalty within 60 days after activation"),
+            ],
+            compute=lambda v: float(np.mean([v["activation_no_dispute"], v["no_sla_penalty_60"]])) * 100.0,
+        ),
+        KpiSection(
+            "Compliance & safety", 0.15,
+            inputs=[
+                ("chk", "no_authority_penalty", "No authority penalty"),
+                ("chk", "no_safety_incident", "No safety incident"),
+            ],
+            compute=lambda v: float(np.mean([v["no_authority_penalty"], v["no_safety_incident"]])) * 100.0,
+        ),
+        KpiSection(
+            "Internal coordination & reporting", 0.10,
+            inputs=[
+                ("chk", "weekly_reporting", "Weekly reporting discipline"),
+                ("chk", "accurate_tracking", "Accurate tracking of material & labour usage report"),
+            ],
+            compute=lambda v: float(np.mean([v["weekly_reporting"], v["accurate_tracking"]])) * 100.0,
+        ),
+    ]
+    kpi_score, bonus_months = render_kpi_block(pm_sections, "pm", decimals=2)
 
     part_b_bonus = basic_salary * bonus_months * kpi_score
     st.success(f"Part B KPI bonus payout: {part_b_bonus:,.2f} {currency}")
@@ -588,112 +770,70 @@ else:
         key="dt_basic_salary",
     )
 
-    def clamp_0_100(x: float) -> float:
-        return max(0.0, min(100.0, x))
-
-    st.markdown("#### 1) On-time delivery — 35%")
-    milestone_on_schedule_pct = st.number_input(
-        "% milestones completed on schedule (0–100)",
-        min_value=0.0,
-        max_value=100.0,
-        value=90.0,
-        step=1.0,
-        key="dt_milestone_pct",
-    )
-    delay_days = st.number_input(
-        "Delay days vs baseline (0 if on time)",
-        min_value=0.0,
-        value=0.0,
-        step=1.0,
-        key="dt_delay_days",
-    )
-    no_missed_critical = st.checkbox("No missed critical milestone", key="dt_no_missed_critical")
-
-    milestone_score = clamp_0_100(milestone_on_schedule_pct)
-    delay_score = clamp_0_100(100.0 - 5.0 * delay_days)
-    critical_score = 100.0 if no_missed_critical else 0.0
-
-    ontime_score = (milestone_score + delay_score + critical_score) / 3.0
-    st.write(f"On-time delivery score: **{ontime_score:.1f}/100**")
-    st.divider()
-
-    st.markdown("#### 2) Budget / cost control — 25%")
-    st.caption("Variance % = (Actual - Budget) / Budget × 100. Positive means over budget.")
-    cost_variance_pct = st.number_input(
-        "Cost variance % (positive = over budget, 0 = on budget)",
-        value=0.0,
-        step=0.5,
-        key="dt_cost_variance_pct",
-    )
-    material_wastage_ok = st.checkbox("Material wastage within limit", key="dt_material_wastage_ok")
-    vo_approved_only = st.checkbox("Only approved variation orders (no unapproved extra work)", key="dt_vo_approved_only")
-
-    if cost_variance_pct <= 0:
-        variance_score = 100.0
-    else:
-        variance_score = clamp_0_100(100.0 - 10.0 * cost_variance_pct)
-
-    wastage_score = 100.0 if material_wastage_ok else 0.0
-    vo_score = 100.0 if vo_approved_only else 0.0
-
-    budget_score = (variance_score + wastage_score + vo_score) / 3.0
-    st.write(f"Budget / cost control score: **{budget_score:.1f}/100**")
-    st.divider()
-
-    st.markdown("#### 3) Quality workmanship — 20%")
-    otdr_fail = st.checkbox("OTDR test fail happened (tick if YES)", key="dt_otdr_fail")
-    no_major_defect_60 = st.checkbox("No major defect within 60 days", key="dt_no_major_defect_60")
-    rework_due_to_team = st.checkbox("Rework required due to workmanship (tick if YES)", key="dt_rework_due_to_team")
-
-    quality_score = 100.0
-    if otdr_fail:
-        quality_score -= 40.0
-    if rework_due_to_team:
-        quality_score -= 40.0
-    if not no_major_defect_60:
-        quality_score -= 20.0
-    quality_score = clamp_0_100(quality_score)
-
-    st.write(f"Quality workmanship score: **{quality_score:.1f}/100**")
-    st.divider()
-
-    st.markdown("#### 4) Safety & compliance — 15%")
-    no_safety_incident = st.checkbox("No safety incident", key="dt_no_safety_incident")
-    no_authority_penalty = st.checkbox("No authority penalty / permit violation", key="dt_no_authority_penalty")
-
-    safety_score = ((100.0 if no_safety_incident else 0.0) + (100.0 if no_authority_penalty else 0.0)) / 2.0
-    st.write(f"Safety & compliance score: **{safety_score:.1f}/100**")
-    st.divider()
-
-    st.markdown("#### 5) Reporting & coordination — 5%")
-    weekly_reporting = st.checkbox("Weekly reporting discipline", key="dt_weekly_reporting")
-    accurate_tracking = st.checkbox("Accurate material & labour usage tracking", key="dt_accurate_tracking")
-
-    reporting_score = ((100.0 if weekly_reporting else 0.0) + (100.0 if accurate_tracking else 0.0)) / 2.0
-    st.write(f"Reporting & coordination score: **{reporting_score:.1f}/100**")
-    st.divider()
-
-    KPI_total = (
-        ontime_score * 0.35
-        + budget_score * 0.25
-        + quality_score * 0.20
-        + safety_score * 0.15
-        + reporting_score * 0.05
-    )
-    kpi_score = KPI_total / 100.0
-
-    st.markdown("### KPI Result")
-    st.write(f"**Overall KPI score:** **{KPI_total:.1f}%**")
-
-    if kpi_score < 0.5:
-        bonus_months = 1.0
-    else:
-        bonus_months = 1.0 + 5.0 * ((kpi_score - 0.5) / 0.5)
-
-    bonus_months = min(bonus_months, 6.0)
-    bonus_months = round(bonus_months, 2)
-
-    st.write(f"**Bonus months (1.00 to 6.00):** **{bonus_months:.2f} months**")
+    dt_sections = [
+        KpiSection(
+            "On-time delivery", 0.35,
+            inputs=[
+                ("num", "milestone_pct", "% milestones completed on schedule (0–100)",
+                 dict(min_value=0.0, max_value=100.0, value=90.0, step=1.0)),
+                ("num", "delay_days", "Delay days vs baseline (0 if on time)",
+                 dict(min_value=0.0, value=0.0, step=1.0)),
+                ("chk", "no_missed_critical", "No missed critical milestone"),
+            ],
+            compute=lambda v: (
+                clamp_0_100(v["milestone_pct"])
+                + clamp_0_100(100.0 - 5.0 * v["delay_days"])
+                + 100.0 * v["no_missed_critical"]
+            ) / 3.0,
+        ),
+        KpiSection(
+            "Budget / cost control", 0.25,
+            caption="Variance % = (Actual - Budget) / Budget × 100. Positive means over budget.",
+            inputs=[
+                ("num", "cost_variance_pct", "Cost variance % (positive = over budget, 0 = on budget)",
+                 dict(value=0.0, step=0.5)),
+                ("chk", "material_wastage_ok", "Material wastage within limit"),
+                ("chk", "vo_approved_only", "Only approved variation orders (no unapproved extra work)"),
+            ],
+            # Under budget (variance <= 0) clamps to a full 100
+            compute=lambda v: (
+                clamp_0_100(100.0 - 10.0 * v["cost_variance_pct"])
+                + 100.0 * v["material_wastage_ok"]
+                + 100.0 * v["vo_approved_only"]
+            ) / 3.0,
+        ),
+        KpiSection(
+            "Quality workmanship", 0.20,
+            inputs=[
+                ("chk", "otdr_fail", "OTDR test fail happened (tick if YES)"),
+                ("chk", "no_major_defect_60", "No major defect within 60 days"),
+                ("chk", "rework_due_to_team", "Rework required due to workmanship (tick if YES)"),
+            ],
+            compute=lambda v: clamp_0_100(
+                100.0
+                - 40.0 * v["otdr_fail"]
+                - 40.0 * v["rework_due_to_team"]
+                - 20.0 * (not v["no_major_defect_60"])
+            ),
+        ),
+        KpiSection(
+            "Safety & compliance", 0.15,
+            inputs=[
+                ("chk", "no_safety_incident", "No safety incident"),
+                ("chk", "no_authority_penalty", "No authority penalty / permit violation"),
+            ],
+            compute=lambda v: float(np.mean([v["no_safety_incident"], v["no_authority_penalty"]])) * 100.0,
+        ),
+        KpiSection(
+            "Reporting & coordination", 0.05,
+            inputs=[
+                ("chk", "weekly_reporting", "Weekly reporting discipline"),
+                ("chk", "accurate_tracking", "Accurate material & labour usage tracking"),
+            ],
+            compute=lambda v: float(np.mean([v["weekly_reporting"], v["accurate_tracking"]])) * 100.0,
+        ),
+    ]
+    kpi_score, bonus_months = render_kpi_block(dt_sections, "dt", decimals=1)
 
     delivery_bonus = basic_salary * bonus_months * kpi_score
     st.success(f"Delivery Team KPI bonus payout: {delivery_bonus:,.2f} {currency}")